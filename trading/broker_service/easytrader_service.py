@@ -5,32 +5,166 @@ EasyTrader微服务 - 提供券商接口的REST API
 """
 
 import os
+import asyncio
+import functools
 import logging
+import random
+import time
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field, replace
 from datetime import datetime
-from typing import Optional, Dict, List, Any
+from typing import Optional, Dict, List, Any, Tuple, Callable, Awaitable
 from contextlib import asynccontextmanager
 
-from fastapi import FastAPI, HTTPException, status
-from pydantic import BaseModel, Field
+from fastapi import FastAPI, HTTPException, Request, status
+from fastapi.middleware.gzip import GZipMiddleware
+from fastapi.responses import ORJSONResponse, StreamingResponse
+from pydantic import BaseModel, Field, model_validator
+import orjson
+import requests
 import uvicorn
 import easytrader
-
-
-# 配置日志
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+try:
+    import redis.asyncio as aioredis
+except ImportError:  # 仅读副本部署模式需要redis
+    aioredis = None
+
+
+# 配置日志(生产环境默认WARNING，日志参数采用%格式延迟格式化，级别关闭时不构造字符串)
+# 级别同时用于logging和uvicorn，只接受两者都支持的名称；logging的别名WARN/FATAL统一为标准名称
+LOG_LEVEL_ALIASES = {"WARN": "WARNING", "FATAL": "CRITICAL"}
+SUPPORTED_LOG_LEVELS = ("CRITICAL", "ERROR", "WARNING", "INFO", "DEBUG")
+LOG_LEVEL = os.getenv("LOG_LEVEL", "WARNING").strip().upper()
+LOG_LEVEL = LOG_LEVEL_ALIASES.get(LOG_LEVEL, LOG_LEVEL)
+if LOG_LEVEL not in SUPPORTED_LOG_LEVELS:
+    raise ValueError(
+        f"不支持的LOG_LEVEL: {os.getenv('LOG_LEVEL')!r}，可选值: {', '.join(SUPPORTED_LOG_LEVELS)}"
+    )
 logging.basicConfig(
-    level=logging.INFO,
+    level=LOG_LEVEL,
     format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
 )
 logger = logging.getLogger(__name__)
 
 
-# 全局变量
-trader = None
-broker_type = "yh"
-trader_connected = False
+@dataclass
+class TraderState:
+    """
+    券商会话状态，保存在 app.state.trader
+    login/logout 通过整体替换对象(dataclasses.replace)更新，handler读取一次即得到一致的状态；
+    lock 在替换时沿用同一把锁——券商客户端(单个GUI实例/单个会话)非线程安全，所有访问需串行进行，
+    拿到锁后应重新读取 app.state.trader 以获得最新会话
+    """
+    client: Any = None
+    connected: bool = False
+    broker: str = "yh"
+    lock: asyncio.Lock = field(default_factory=asyncio.Lock)
+
+
+# easytrader调用均为阻塞操作(GUI自动化/HTTP抓取)，放入线程池执行避免阻塞事件循环
+# 所有券商调用已在 TraderState.lock 下串行执行，多线程不会带来并行；使用单线程保证
+# ht/yh 等 pywinauto 驱动的GUI客户端始终由同一个线程操作(COM/窗口自动化要求线程一致)
+# 线程池随lifespan创建和关闭，同一进程内可多次启动/关闭应用(如测试中多次创建TestClient)
+EXECUTOR_WORKERS = 1
+executor: Optional[ThreadPoolExecutor] = None
+
+# 只读接口缓存: trader属性名 -> (写入时间, 数据)，TTL(秒)按数据变化频率设置
+CACHE_TTL = {
+    "position": 2.0,
+    "balance": 2.0,
+    "today_entrusts": 1.0,
+    "today_trades": 1.0,
+}
+_cache: Dict[str, Tuple[float, Any]] = {}
+# 后台刷新: 每隔 REFRESH_INTERVAL 秒(附加随机抖动)在线程池中读取全部只读属性写入缓存，
+# 开启后只读接口始终直接返回最近一次刷新结果，不再因TTL过期而等待券商；设为0关闭
+REFRESH_INTERVAL = float(os.getenv("REFRESH_INTERVAL", "1.0"))
+REFRESH_JITTER = 0.2
+# 最近一次后台刷新失败的属性；这些属性及超过 刷新间隔 + 一轮刷新耗时 + TTL 未更新的缓存按过期处理
+_refresh_failed = set()
+# 最近一轮完整刷新的耗时(秒)及当前一轮的开始时间(monotonic，不在刷新中为None)；
+# 券商读取较慢或与下单争锁时一轮刷新可能远超间隔，过期阈值需计入实际耗时
+_refresh_cycle_s = 0.0
+_refresh_pass_started: Optional[float] = None
+# /snapshot 返回字段 -> trader属性名
+SNAPSHOT_FIELDS = {
+    "balance": "balance",
+    "positions": "position",
+    "orders": "today_entrusts",
+    "trades": "today_trades",
+}
+# 下单幂等: 相同 Idempotency-Key 的并发请求共享一次券商调用，成功结果保留TTL(秒)供重试直接返回；
+# 每个key同时记录委托指纹(方向, 代码, 价格, 数量)，同一key用于不同委托时拒绝而不是返回旧结果
+IDEMPOTENCY_TTL = 60.0
+_inflight_orders: Dict[str, Tuple[Tuple, asyncio.Task]] = {}
+_completed_orders: Dict[str, Tuple[float, Tuple, Dict[str, Any]]] = {}
+# 委托方向(即easytrader方法名) -> 日志/错误描述
+ORDER_SIDES = {"buy": "买入", "sell": "卖出"}
+# 券商调用失败、返回上次缓存数据时附带的响应头
+STALE_HEADERS = {"X-Cache": "stale"}
+# 列表类接口在请求头 Accept 包含该类型时按NDJSON逐行流式返回(每行一条记录)
+NDJSON_MEDIA_TYPE = "application/x-ndjson"
+# 每个ASGI消息包含的记录数，避免逐行发送导致经过中间件的send调用次数与行数相同
+NDJSON_BATCH_ROWS = 256
+
+# 响应时间戳(秒级精度)，由_clock_ticker后台任务定时刷新，避免每次响应都格式化当前时间
+CLOCK_TICK_INTERVAL = 0.5
+_now_iso = datetime.now().isoformat(timespec="seconds")
+
+# 部署角色: primary 持有券商会话；replica 不登录券商，只读接口从Redis读取primary发布的快照
+ROLES = ("primary", "replica")
+ROLE = os.getenv("EASYTRADER_ROLE", "primary")
+# uvicorn worker数；每个worker各自持有锁、缓存和幂等表，只有replica允许多worker
+WORKERS = int(os.getenv("WORKERS", "1"))
+REDIS_URL = os.getenv("REDIS_URL", "")
+REPLICA_SNAPSHOT_KEY = "et:snapshot"
+REPLICA_SNAPSHOT_TTL = 5
+REPLICA_PUBLISH_INTERVAL = float(os.getenv("SNAPSHOT_PUBLISH_INTERVAL", "1.0"))
+# primary发布到Redis的trader属性，每项为 {"data": 数据, "read_at": 读取券商的unix时间, "stale": 是否过期}
+REPLICA_ATTRS = ("position", "balance")
+redis_client = None
+
+
+# 网页类券商(yjb/xq等)的HTTP会话连接池配置，进程内复用长连接避免重复TLS握手
+HTTP_POOL_CONNECTIONS = 10
+HTTP_POOL_MAXSIZE = 20
+# 仅重试幂等请求(urllib3默认不重试POST)，避免下单请求被重复提交
+HTTP_RETRY = Retry(total=3, backoff_factor=0.3, status_forcelist=(502, 503, 504))
+
+
+# 503类错误频繁出现(如收盘后券商断开)，在模块加载时预先构造；
+# 重复抛出同一实例时用 with_traceback(None) 清空上次的traceback，避免其不断累积
+_ERR_NOT_CONNECTED = HTTPException(
+    status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+    detail="未登录券商"
+)
+_ERR_SNAPSHOT_UNAVAILABLE = HTTPException(
+    status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+    detail="快照不可用"
+)
+_ERR_REPLICA_LOGIN = HTTPException(
+    status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+    detail="replica实例不持有券商会话，请在primary实例登录"
+)
 
 
 # 请求/响应模型
+# 股票代码格式: 交易所前缀(sh/sz/bj) + 6位ASCII数字(不用\d，其在pydantic中匹配全角等Unicode数字)，在请求校验阶段拒绝非法代码，避免占用券商客户端
+SYMBOL_PATTERN = r"^(sh|sz|bj)[0-9]{6}$"
+MAX_ORDER_PRICE = 10000
+MAX_ORDER_AMOUNT = 1_000_000
+# 买入数量规则: 主板/创业板须为整手(100股整数倍)；科创板(sh688/sh689)单笔不少于200股、
+# 北交所(bj)不少于100股，超出部分均可按1股递增。卖出允许零股，不做限制
+BOARD_LOT = 100
+STAR_PREFIXES = ("sh688", "sh689")
+STAR_MIN_BUY = 200
+BSE_PREFIX = "bj"
+BSE_MIN_BUY = 100
+
+
 class LoginRequest(BaseModel):
     broker_type: str = Field(..., description="券商类型: ht, yh, yjb, xq等")
     username: Optional[str] = Field(None, description="用户名")
@@ -39,15 +173,29 @@ class LoginRequest(BaseModel):
 
 
 class BuyRequest(BaseModel):
-    symbol: str = Field(..., description="股票代码，如 sh600000")
-    price: float = Field(..., gt=0, description="买入价格")
-    amount: int = Field(..., gt=0, description="买入数量")
+    symbol: str = Field(..., pattern=SYMBOL_PATTERN, description="股票代码，如 sh600000")
+    price: float = Field(..., gt=0, le=MAX_ORDER_PRICE, description="买入价格")
+    amount: int = Field(..., gt=0, le=MAX_ORDER_AMOUNT, description="买入数量(主板/创业板为100股整数倍，科创板≥200股，北交所≥100股)")
+
+    @model_validator(mode="after")
+    def check_buy_lot(self):
+        """按板块校验买入数量"""
+        if self.symbol.startswith(STAR_PREFIXES):
+            if self.amount < STAR_MIN_BUY:
+                raise ValueError(f"科创板买入数量不少于{STAR_MIN_BUY}股")
+        elif self.symbol.startswith(BSE_PREFIX):
+            if self.amount < BSE_MIN_BUY:
+                raise ValueError(f"北交所买入数量不少于{BSE_MIN_BUY}股")
+        elif self.amount % BOARD_LOT:
+            raise ValueError(f"主板/创业板买入数量须为{BOARD_LOT}股的整数倍")
+        return self
 
 
 class SellRequest(BaseModel):
-    symbol: str = Field(..., description="股票代码，如 sh600000")
-    price: float = Field(..., gt=0, description="卖出价格")
-    amount: int = Field(..., gt=0, description="卖出数量")
+    symbol: str = Field(..., pattern=SYMBOL_PATTERN, description="股票代码，如 sh600000")
+    price: float = Field(..., gt=0, le=MAX_ORDER_PRICE, description="卖出价格")
+    # 卖出允许零股(不足一手的余股)，不限制为100的整数倍
+    amount: int = Field(..., gt=0, le=MAX_ORDER_AMOUNT, description="卖出数量")
 
 
 class CancelRequest(BaseModel):
@@ -59,54 +207,467 @@ class ResponseModel(BaseModel):
     message: str
     data: Optional[Any] = None
     timestamp: str
+    # 只读接口返回的数据距上次从券商读取的毫秒数
+    stale_ms: Optional[int] = None
+
+
+# ResponseModel仅用于OpenAPI文档，实际响应由create_response直接序列化，不再做返回值校验
+DOC_RESPONSES = {200: {"model": ResponseModel}}
+
+
+def create_response(
+    success: bool,
+    message: str,
+    data: Any = None,
+    headers: Optional[Dict[str, str]] = None,
+    stale_ms: Optional[int] = None
+) -> ORJSONResponse:
+    """创建标准响应(结构同ResponseModel，直接由orjson序列化，跳过Pydantic校验)"""
+    content = {
+        "success": success,
+        "message": message,
+        "data": data,
+        "timestamp": _now_iso
+    }
+    if stale_ms is not None:
+        content["stale_ms"] = stale_ms
+    return ORJSONResponse(content, headers=headers)
+
+
+def wants_ndjson(request: Request) -> bool:
+    """客户端是否通过Accept请求头要求NDJSON流式响应"""
+    return NDJSON_MEDIA_TYPE in request.headers.get("accept", "")
+
+
+def ndjson_response(rows: Any, stale: bool = False, stale_ms: Optional[int] = None) -> StreamingResponse:
+    """
+    将记录列表按NDJSON序列化并分批流式返回(每批 NDJSON_BATCH_ROWS 行)，客户端可边接收边解析
+    NDJSON没有外层结构，缓存状态通过响应头 X-Cache / X-Stale-Ms 返回
+    """
+    if not isinstance(rows, list):
+        rows = [rows]
+
+    async def generate():
+        for i in range(0, len(rows), NDJSON_BATCH_ROWS):
+            yield b"".join(orjson.dumps(row) + b"\n" for row in rows[i:i + NDJSON_BATCH_ROWS])
+
+    headers = dict(STALE_HEADERS) if stale else {}
+    if stale_ms is not None:
+        headers["X-Stale-Ms"] = str(stale_ms)
+    return StreamingResponse(generate(), media_type=NDJSON_MEDIA_TYPE, headers=headers)
+
+
+def check_deployment():
+    """
+    校验部署配置
+    primary 的每个worker都会以同一账号自动登录并驱动同一个券商客户端，且锁/缓存/幂等表均为进程内，
+    多worker会破坏下单串行化与去重，因此 primary 只允许单worker；
+    replica 的只读接口完全依赖Redis快照，必须配置 REDIS_URL 并安装 redis
+    """
+    if ROLE not in ROLES:
+        raise RuntimeError(f"未知的 EASYTRADER_ROLE={ROLE!r}，可选值: {', '.join(ROLES)}")
+    if ROLE == "replica" and not REDIS_URL:
+        raise RuntimeError("EASYTRADER_ROLE=replica 需要配置 REDIS_URL")
+    if ROLE == "replica" and aioredis is None:
+        raise RuntimeError("EASYTRADER_ROLE=replica 需要安装 redis>=5.0.1")
+    if WORKERS > 1 and ROLE != "replica":
+        raise RuntimeError(
+            f"WORKERS={WORKERS} 仅支持 EASYTRADER_ROLE=replica，primary 实例必须单worker运行"
+        )
 
 
-def create_response(success: bool, message: str, data: Any = None) -> ResponseModel:
-    """创建标准响应"""
-    return ResponseModel(
-        success=success,
-        message=message,
-        data=data,
-        timestamp=datetime.now().isoformat()
-    )
+async def _clock_ticker():
+    """定时刷新响应时间戳"""
+    global _now_iso
+    while True:
+        _now_iso = datetime.now().isoformat(timespec="seconds")
+        await asyncio.sleep(CLOCK_TICK_INTERVAL)
+
+
+async def run_blocking(func, *args, **kwargs):
+    """在线程池中执行阻塞的easytrader调用"""
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(executor, functools.partial(func, *args, **kwargs))
+
+
+def invalidate_cache(*attrs: str):
+    """使只读接口缓存失效，不传参数时清空全部"""
+    if not attrs:
+        _cache.clear()
+        _refresh_failed.clear()
+        return
+    for attr in attrs:
+        _cache.pop(attr, None)
+        _refresh_failed.discard(attr)
+
+
+def _cache_fresh(attr: str) -> Optional[Tuple[float, Any]]:
+    entry = _cache.get(attr)
+    if entry and time.monotonic() - entry[0] < CACHE_TTL[attr]:
+        return entry
+    return None
+
+
+def tune_http_session(client: Any):
+    """为网页类券商客户端的requests会话挂载连接池并保持长连接，GUI类客户端无会话则跳过"""
+    for name in ("s", "session"):
+        session = getattr(client, name, None)
+        if isinstance(session, requests.Session):
+            adapter = HTTPAdapter(
+                pool_connections=HTTP_POOL_CONNECTIONS,
+                pool_maxsize=HTTP_POOL_MAXSIZE,
+                max_retries=HTTP_RETRY
+            )
+            session.mount("https://", adapter)
+            session.mount("http://", adapter)
+            session.headers["Connection"] = "keep-alive"
+
+
+def cache_age_ms(*attrs: str) -> Optional[int]:
+    """缓存数据距上次从券商读取的毫秒数(多个属性取最旧的)，无缓存时返回None"""
+    entries = [_cache.get(attr) for attr in attrs]
+    if not all(entries):
+        return None
+    return int((time.monotonic() - min(ts for ts, _ in entries)) * 1000)
+
+
+def _cache_usable(attr: str) -> Optional[Tuple[float, Any]]:
+    """可直接返回的缓存项：开启后台刷新时取最近一次结果，否则要求在TTL内"""
+    return _cache.get(attr) if REFRESH_INTERVAL > 0 else _cache_fresh(attr)
+
+
+def _cache_stale(attr: str) -> bool:
+    """
+    后台刷新模式下缓存是否已过期：最近一次刷新失败，或超过一个刷新周期加TTL仍未更新
+    刷新周期 = 间隔 + 抖动 + 一轮刷新耗时(取上一轮耗时与当前一轮已用时间中较大者)
+    """
+    if REFRESH_INTERVAL <= 0:
+        return False
+    if attr in _refresh_failed:
+        return True
+    entry = _cache.get(attr)
+    if entry is None:
+        return True
+    now = time.monotonic()
+    cycle = _refresh_cycle_s
+    if _refresh_pass_started is not None:
+        cycle = max(cycle, now - _refresh_pass_started)
+    return now - entry[0] > REFRESH_INTERVAL + REFRESH_JITTER + cycle + CACHE_TTL[attr]
+
+
+def _read_attr(client: Any, attr: str) -> Any:
+    """
+    读取trader属性(在线程池中执行)
+    部分easytrader版本返回pandas DataFrame，这里统一转为字典列表，后续计数/序列化不再逐行反射pandas对象
+    """
+    data = getattr(client, attr)
+    if hasattr(data, "to_dict") and hasattr(data, "shape"):
+        return data.to_dict("records")
+    return data
+
+
+async def read_replica_snapshot(attr: str) -> Tuple[Any, bool]:
+    """
+    从Redis读取primary发布的快照(replica角色)，返回 (数据, 是否为过期缓存)
+    replica不访问券商，将primary的读取时间换算为本地monotonic时间写入缓存，stale_ms 与primary一致
+    """
+    raw = await redis_client.get(REPLICA_SNAPSHOT_KEY) if redis_client else None
+    snapshot = orjson.loads(raw) if raw else {}
+    if attr not in snapshot:
+        raise _ERR_SNAPSHOT_UNAVAILABLE.with_traceback(None)
+    entry = snapshot[attr]
+    age = max(0.0, time.time() - entry["read_at"])
+    _cache[attr] = (time.monotonic() - age, entry["data"])
+    return entry["data"], entry["stale"]
+
+
+async def _snapshot_publisher(app: FastAPI):
+    """
+    primary角色定时将持仓/余额发布到Redis，供replica读取
+    同时发布读取时间和过期标记：刷新停滞时快照键仍会续期，replica据此返回 X-Cache: stale 和 stale_ms
+    """
+    while True:
+        if app.state.trader.connected:
+            try:
+                snapshot = {}
+                for attr in REPLICA_ATTRS:
+                    data, stale = await read_trader_cached(app, attr)
+                    read_at = time.time() - (time.monotonic() - _cache[attr][0])
+                    snapshot[attr] = {"data": data, "read_at": read_at, "stale": stale}
+                await redis_client.set(REPLICA_SNAPSHOT_KEY, orjson.dumps(snapshot), ex=REPLICA_SNAPSHOT_TTL)
+            except Exception as e:
+                logger.warning("发布快照失败: %s", e)
+        await asyncio.sleep(REPLICA_PUBLISH_INTERVAL)
+
+
+async def _refresh_loop(app: FastAPI):
+    """
+    后台定时刷新全部只读属性，使只读接口与券商读取频率解耦
+    逐个属性读取并单独处理异常，某一属性失败不影响其他属性更新；每个属性单独加锁，下单请求可在属性之间插入
+    每轮记录耗时供 _cache_stale 计算过期阈值，未连接而中断的一轮不计入
+    """
+    global _refresh_cycle_s, _refresh_pass_started
+    while True:
+        _refresh_pass_started = time.monotonic()
+        for attr in CACHE_TTL:
+            if not app.state.trader.connected:
+                break
+            async with app.state.trader.lock:
+                st = app.state.trader
+                if not st.client or not st.connected:
+                    break
+                try:
+                    value = await run_blocking(_read_attr, st.client, attr)
+                except Exception as e:
+                    # 保留上次结果并标记过期，客户端通过 X-Cache: stale 及 stale_ms 发现刷新失败
+                    _refresh_failed.add(attr)
+                    logger.warning("后台刷新%s失败: %s", attr, e)
+                    continue
+                _cache[attr] = (time.monotonic(), value)
+                _refresh_failed.discard(attr)
+        else:
+            _refresh_cycle_s = time.monotonic() - _refresh_pass_started
+        _refresh_pass_started = None
+        await asyncio.sleep(REFRESH_INTERVAL + random.uniform(0, REFRESH_JITTER))
+
+
+async def read_trader_cached(app: FastAPI, attr: str) -> Tuple[Any, bool]:
+    """
+    读取trader只读属性，TTL内直接返回缓存
+    并发请求在会话锁上排队，拿到锁后再次检查缓存，只有一个请求真正访问券商
+    券商调用失败时若有旧数据则回退返回
+
+    replica角色下直接读取Redis快照；开启后台刷新时有缓存即返回，不受TTL限制
+
+    Returns:
+        (数据, 是否为过期缓存)
+    """
+    if ROLE == "replica":
+        return await read_replica_snapshot(attr)
+
+    entry = _cache_usable(attr)
+    if entry:
+        return entry[1], _cache_stale(attr)
+
+    async with app.state.trader.lock:
+        st = app.state.trader
+        if not st.client or not st.connected:
+            raise _ERR_NOT_CONNECTED.with_traceback(None)
+
+        entry = _cache_usable(attr)
+        if entry:
+            return entry[1], _cache_stale(attr)
+
+        try:
+            data = await run_blocking(_read_attr, st.client, attr)
+        except Exception as e:
+            stale = _cache.get(attr)
+            if stale is None:
+                raise
+            logger.warning("读取%s失败，返回缓存数据: %s", attr, e)
+            return stale[1], True
+
+        _cache[attr] = (time.monotonic(), data)
+        _refresh_failed.discard(attr)
+        return data, False
+
+
+def idempotency_key(request: Request, side: str) -> Optional[str]:
+    """读取 Idempotency-Key 请求头，按委托方向区分命名空间"""
+    key = request.headers.get("Idempotency-Key")
+    return f"{side}:{key}" if key else None
+
+
+def order_fingerprint(side: str, req: Any) -> Tuple:
+    """委托指纹，用于校验同一幂等键是否对应同一笔委托"""
+    return (side, req.symbol, req.price, req.amount)
+
+
+def _check_fingerprint(expected: Tuple, fingerprint: Tuple):
+    if expected != fingerprint:
+        raise HTTPException(
+            status_code=status.HTTP_409_CONFLICT,
+            detail="Idempotency-Key 已用于其他委托，请为新委托使用新的key"
+        )
+
+
+def _finish_idempotent(key: str, fingerprint: Tuple, task: asyncio.Task):
+    _inflight_orders.pop(key, None)
+    if task.cancelled() or task.exception() is not None:
+        # 失败的请求不缓存，允许客户端用同一个key重试
+        return
+    now = time.monotonic()
+    for expired in [k for k, (ts, _, _) in _completed_orders.items() if now - ts >= IDEMPOTENCY_TTL]:
+        del _completed_orders[expired]
+    _completed_orders[key] = (now, fingerprint, task.result())
+
+
+async def run_idempotent(
+    key: Optional[str],
+    fingerprint: Tuple,
+    place: Callable[[], Awaitable[Dict[str, Any]]]
+) -> Dict[str, Any]:
+    """
+    按幂等键执行下单：TTL内已成功的直接返回原结果，进行中的等待同一个任务
+    key相同但委托指纹不同时返回409，不会把旧委托的结果当作新委托已提交
+    下单任务用shield保护，客户端断开连接不会中断已发往券商的委托
+    """
+    if not key:
+        return await place()
+
+    done = _completed_orders.get(key)
+    if done and time.monotonic() - done[0] < IDEMPOTENCY_TTL:
+        _check_fingerprint(done[1], fingerprint)
+        return done[2]
+
+    inflight = _inflight_orders.get(key)
+    if inflight is None:
+        task = asyncio.ensure_future(place())
+        _inflight_orders[key] = (fingerprint, task)
+        task.add_done_callback(functools.partial(_finish_idempotent, key, fingerprint))
+    else:
+        _check_fingerprint(inflight[0], fingerprint)
+        task = inflight[1]
+    return await asyncio.shield(task)
+
+
+async def place_order(app: FastAPI, side: str, req: Any) -> Dict[str, Any]:
+    """在会话锁内提交买入/卖出委托，返回响应数据"""
+    label = ORDER_SIDES[side]
+    async with app.state.trader.lock:
+        st = app.state.trader
+        if not st.client or not st.connected:
+            raise _ERR_NOT_CONNECTED.with_traceback(None)
+
+        try:
+            # easytrader买入/卖出返回委托编号
+            result = await run_blocking(getattr(st.client, side), req.symbol, price=req.price, amount=req.amount)
+            invalidate_cache()
+            logger.info("%s请求: %s, 价格: %s, 数量: %s, 结果: %s", label, req.symbol, req.price, req.amount, result)
+        except Exception as e:
+            logger.error("%s失败: %s", label, e)
+            raise HTTPException(
+                status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+                detail=f"{label}失败: {str(e)}"
+            )
+
+    return {
+        "symbol": req.symbol,
+        "price": req.price,
+        "amount": req.amount,
+        "order_id": result
+    }
 
 
 @asynccontextmanager
 async def lifespan(app: FastAPI):
     """应用生命周期管理"""
-    global trader, trader_connected
+    global executor, redis_client
     # 启动时初始化
     logger.info("EasyTrader服务启动中...")
+    check_deployment()
+    executor = ThreadPoolExecutor(max_workers=EXECUTOR_WORKERS, thread_name_prefix="easytrader")
+    # 每次启动使用新的会话状态，锁绑定到当前事件循环
+    app.state.trader = TraderState()
+    background_tasks = [asyncio.create_task(_clock_ticker())]
+
+    if REDIS_URL:
+        if aioredis is None:
+            logger.warning("已配置REDIS_URL但未安装redis，不向replica发布快照")
+        else:
+            redis_client = aioredis.from_url(REDIS_URL)
+            if ROLE != "replica":
+                background_tasks.append(asyncio.create_task(_snapshot_publisher(app)))
+
     broker_type_env = os.getenv("BROKER_TYPE", "yh")
     username = os.getenv("BROKER_USERNAME", "")
     password = os.getenv("BROKER_PASSWORD", "")
     
-    if username and password:
+    if ROLE == "replica":
+        # 只读副本不持有券商会话
+        logger.info("以replica角色启动，只读接口从Redis快照读取")
+    elif username and password:
+        client = None
         try:
-            trader = easytrader.use(broker_type_env)
+            client = easytrader.use(broker_type_env)
+            tune_http_session(client)
+            await run_blocking(client.prepare, os.getenv("BROKER_EXE_PATH", ""))
             if broker_type_env == "yh":
-                trader.prepare(os.getenv("BROKER_EXE_PATH", ""))
-                trader.login()
+                await run_blocking(client.login)
             else:
-                trader.prepare(os.getenv("BROKER_EXE_PATH", ""))
-                trader.login(username, password)
-            trader_connected = True
-            logger.info(f"成功登录券商: {broker_type_env}")
+                await run_blocking(client.login, username, password)
+            app.state.trader = replace(app.state.trader, client=client, connected=True, broker=broker_type_env)
+            logger.info("成功登录券商: %s", broker_type_env)
         except Exception as e:
-            logger.warning(f"自动登录失败: {e}, 请手动调用login接口")
-            trader_connected = False
+            logger.warning("自动登录失败: %s, 请手动调用login接口", e)
+            # 保留已创建的客户端，关闭时退出
+            app.state.trader = replace(app.state.trader, client=client, connected=False)
     else:
         logger.info("未配置自动登录，请调用login接口")
+
+    # 在自动登录之后启动，首轮刷新即可读取，不必等待一个刷新周期
+    if ROLE != "replica" and REFRESH_INTERVAL > 0:
+        background_tasks.append(asyncio.create_task(_refresh_loop(app)))
     
     yield
     
     # 关闭时清理
     logger.info("EasyTrader服务关闭中...")
-    if trader:
+    for task in background_tasks:
+        task.cancel()
+    await asyncio.gather(*background_tasks, return_exceptions=True)
+    st = app.state.trader
+    if st.client:
         try:
-            trader.exit()
+            await run_blocking(st.client.exit)
         except Exception as e:
-            logger.warning(f"退出券商客户端失败: {e}")
+            logger.warning("退出券商客户端失败: %s", e)
+    if redis_client:
+        await redis_client.aclose()
+        redis_client = None
+    app.state.trader = TraderState()
+    executor.shutdown(wait=False)
+    executor = None
+
+
+class HealthMiddleware:
+    """
+    纯ASGI中间件：GET /health 在进入FastAPI路由前直接应答
+    负载均衡/k8s探针高频调用，响应体按(连接状态, 券商类型, 时间戳)缓存，状态不变时复用同一字节串
+    """
+
+    def __init__(self, app):
+        self.app = app
+        self._key = None
+        self._body = b""
+
+    def _render(self, st: TraderState) -> bytes:
+        key = (st.connected, st.broker, _now_iso)
+        if key != self._key:
+            self._body = orjson.dumps({
+                "success": True,
+                "message": "服务正常",
+                "data": {"connected": st.connected, "broker_type": st.broker},
+                "timestamp": _now_iso
+            })
+            self._key = key
+        return self._body
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or scope["path"] != "/health" or scope["method"] != "GET":
+            await self.app(scope, receive, send)
+            return
+
+        body = self._render(scope["app"].state.trader)
+        await send({
+            "type": "http.response.start",
+            "status": 200,
+            "headers": [
+                (b"content-type", b"application/json"),
+                (b"content-length", str(len(body)).encode()),
+            ],
+        })
+        await send({"type": "http.response.body", "body": body})
 
 
 # 创建FastAPI应用
@@ -114,284 +675,328 @@ app = FastAPI(
     title="EasyTrader微服务",
     description="提供券商接口REST API",
     version="1.0.0",
-    lifespan=lifespan
+    lifespan=lifespan,
+    default_response_class=ORJSONResponse
 )
+app.state.trader = TraderState()
+# 持仓/委托/成交列表字段名重复度高，压缩收益明显；compresslevel=3 以少量压缩率换取更快的压缩速度
+app.add_middleware(GZipMiddleware, minimum_size=512, compresslevel=3)
+# 后添加的中间件位于最外层，/health 在压缩之前直接应答
+app.add_middleware(HealthMiddleware)
 
 
-@app.get("/health", response_model=ResponseModel)
-async def health_check():
-    """健康检查"""
+@app.get("/health", responses=DOC_RESPONSES)
+async def health_check(request: Request):
+    """健康检查(GET请求由HealthMiddleware直接应答，此路由保留用于OpenAPI文档)"""
+    st = request.app.state.trader
     return create_response(
         success=True,
         message="服务正常",
-        data={"connected": trader_connected, "broker_type": broker_type}
+        data={"connected": st.connected, "broker_type": st.broker}
     )
 
 
-@app.post("/login", response_model=ResponseModel)
-async def login(req: LoginRequest):
+@app.post("/login", responses=DOC_RESPONSES)
+async def login(req: LoginRequest, request: Request):
     """登录券商"""
-    global trader, trader_connected, broker_type
-    
-    try:
-        trader = easytrader.use(req.broker_type)
-        broker_type = req.broker_type
+    if ROLE == "replica":
+        raise _ERR_REPLICA_LOGIN.with_traceback(None)
+
+    async with request.app.state.trader.lock:
+        st = request.app.state.trader
+        invalidate_cache()
+        client = None
+        try:
+            client = easytrader.use(req.broker_type)
+            tune_http_session(client)
         
-        # 根据券商类型调用不同的登录方法
-        if req.broker_type == "yh":
-            # 银河证券需要先prepare，然后直接登录
-            exe_path = req.exe_path or os.getenv("BROKER_EXE_PATH", "")
-            if exe_path:
-                trader.prepare(exe_path)
+            # 根据券商类型调用不同的登录方法
+            if req.broker_type == "yh":
+                # 银河证券需要先prepare，然后直接登录
+                exe_path = req.exe_path or os.getenv("BROKER_EXE_PATH", "")
+                if exe_path:
+                    await run_blocking(client.prepare, exe_path)
+                else:
+                    await run_blocking(client.prepare)
+                await run_blocking(client.login)
             else:
-                trader.prepare()
-            trader.login()
-        else:
-            # 其他券商
-            exe_path = req.exe_path or os.getenv("BROKER_EXE_PATH", "")
-            if exe_path:
-                trader.prepare(exe_path)
-            else:
-                trader.prepare()
-            trader.login(req.username, req.password)
+                # 其他券商
+                exe_path = req.exe_path or os.getenv("BROKER_EXE_PATH", "")
+                if exe_path:
+                    await run_blocking(client.prepare, exe_path)
+                else:
+                    await run_blocking(client.prepare)
+                await run_blocking(client.login, req.username, req.password)
         
-        trader_connected = True
-        logger.info(f"成功登录券商: {req.broker_type}")
+            request.app.state.trader = replace(st, client=client, connected=True, broker=req.broker_type)
+            logger.info("成功登录券商: %s", req.broker_type)
         
-        return create_response(
-            success=True,
-            message=f"成功登录券商: {req.broker_type}",
-            data={"broker_type": req.broker_type}
-        )
-    except Exception as e:
-        trader_connected = False
-        logger.error(f"登录失败: {e}")
-        raise HTTPException(
-            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
-            detail=f"登录失败: {str(e)}"
-        )
-
-
-@app.get("/logout", response_model=ResponseModel)
-async def logout():
+            return create_response(
+                success=True,
+                message=f"成功登录券商: {req.broker_type}",
+                data={"broker_type": req.broker_type}
+            )
+        except Exception as e:
+            # 保留已创建的客户端，便于logout时退出
+            request.app.state.trader = replace(
+                st,
+                client=client or st.client,
+                connected=False,
+                broker=req.broker_type if client else st.broker
+            )
+            logger.error("登录失败: %s", e)
+            raise HTTPException(
+                status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+                detail=f"登录失败: {str(e)}"
+            )
+
+
+@app.get("/logout", responses=DOC_RESPONSES)
+async def logout(request: Request):
     """退出登录"""
-    global trader, trader_connected
+    async with request.app.state.trader.lock:
+        st = request.app.state.trader
+        if not st.client:
+            return create_response(success=False, message="未登录")
     
-    if not trader:
-        return create_response(success=False, message="未登录")
-    
-    try:
-        trader.exit()
-        trader_connected = False
-        trader = None
-        return create_response(success=True, message="已退出登录")
-    except Exception as e:
-        logger.error(f"退出登录失败: {e}")
-        raise HTTPException(
-            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
-            detail=f"退出登录失败: {str(e)}"
-        )
-
-
-@app.post("/buy", response_model=ResponseModel)
-async def buy(req: BuyRequest):
-    """买入股票"""
-    if not trader or not trader_connected:
-        raise HTTPException(
-            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
-            detail="未登录券商"
-        )
-    
-    try:
-        # easytrader买入返回委托编号
-        result = trader.buy(req.symbol, price=req.price, amount=req.amount)
-        logger.info(f"买入请求: {req.symbol}, 价格: {req.price}, 数量: {req.amount}, 结果: {result}")
-        
-        return create_response(
-            success=True,
-            message="买入请求已提交",
-            data={
-                "symbol": req.symbol,
-                "price": req.price,
-                "amount": req.amount,
-                "order_id": result
-            }
-        )
-    except Exception as e:
-        logger.error(f"买入失败: {e}")
-        raise HTTPException(
-            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
-            detail=f"买入失败: {str(e)}"
-        )
+        try:
+            await run_blocking(st.client.exit)
+            request.app.state.trader = replace(st, client=None, connected=False)
+            invalidate_cache()
+            return create_response(success=True, message="已退出登录")
+        except Exception as e:
+            logger.error("退出登录失败: %s", e)
+            raise HTTPException(
+                status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+                detail=f"退出登录失败: {str(e)}"
+            )
+
+
+@app.post("/buy", responses=DOC_RESPONSES)
+async def buy(req: BuyRequest, request: Request):
+    """买入股票(可携带 Idempotency-Key 请求头，重试时不会重复下单)"""
+    data = await run_idempotent(
+        idempotency_key(request, "buy"),
+        order_fingerprint("buy", req),
+        functools.partial(place_order, request.app, "buy", req)
+    )
+    return create_response(
+        success=True,
+        message="买入请求已提交",
+        data=data
+    )
 
 
-@app.post("/sell", response_model=ResponseModel)
-async def sell(req: SellRequest):
-    """卖出股票"""
-    if not trader or not trader_connected:
-        raise HTTPException(
-            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
-            detail="未登录券商"
-        )
-    
-    try:
-        result = trader.sell(req.symbol, price=req.price, amount=req.amount)
-        logger.info(f"卖出请求: {req.symbol}, 价格: {req.price}, 数量: {req.amount}, 结果: {result}")
-        
-        return create_response(
-            success=True,
-            message="卖出请求已提交",
-            data={
-                "symbol": req.symbol,
-                "price": req.price,
-                "amount": req.amount,
-                "order_id": result
-            }
-        )
-    except Exception as e:
-        logger.error(f"卖出失败: {e}")
-        raise HTTPException(
-            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
-            detail=f"卖出失败: {str(e)}"
-        )
+@app.post("/sell", responses=DOC_RESPONSES)
+async def sell(req: SellRequest, request: Request):
+    """卖出股票(可携带 Idempotency-Key 请求头，重试时不会重复下单)"""
+    data = await run_idempotent(
+        idempotency_key(request, "sell"),
+        order_fingerprint("sell", req),
+        functools.partial(place_order, request.app, "sell", req)
+    )
+    return create_response(
+        success=True,
+        message="卖出请求已提交",
+        data=data
+    )
 
 
-@app.post("/cancel", response_model=ResponseModel)
-async def cancel(req: CancelRequest):
+@app.post("/cancel", responses=DOC_RESPONSES)
+async def cancel(req: CancelRequest, request: Request):
     """撤销委托"""
-    if not trader or not trader_connected:
-        raise HTTPException(
-            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
-            detail="未登录券商"
-        )
+    async with request.app.state.trader.lock:
+        st = request.app.state.trader
+        if not st.client or not st.connected:
+            raise _ERR_NOT_CONNECTED.with_traceback(None)
     
-    try:
-        result = trader.cancel_entrust(req.order_id)
-        logger.info(f"撤销委托: {req.order_id}, 结果: {result}")
+        try:
+            result = await run_blocking(st.client.cancel_entrust, req.order_id)
+            invalidate_cache()
+            logger.info("撤销委托: %s, 结果: %s", req.order_id, result)
         
-        return create_response(
-            success=True,
-            message="撤销委托请求已提交",
-            data={"order_id": req.order_id, "result": result}
-        )
-    except Exception as e:
-        logger.error(f"撤销委托失败: {e}")
-        raise HTTPException(
-            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
-            detail=f"撤销委托失败: {str(e)}"
-        )
+            return create_response(
+                success=True,
+                message="撤销委托请求已提交",
+                data={"order_id": req.order_id, "result": result}
+            )
+        except Exception as e:
+            logger.error("撤销委托失败: %s", e)
+            raise HTTPException(
+                status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+                detail=f"撤销委托失败: {str(e)}"
+            )
 
 
-@app.get("/portfolio", response_model=ResponseModel)
-async def get_portfolio():
-    """获取持仓信息"""
-    if not trader or not trader_connected:
-        raise HTTPException(
-            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
-            detail="未登录券商"
-        )
-    
+@app.get("/portfolio", responses=DOC_RESPONSES)
+async def get_portfolio(request: Request):
+    """获取持仓信息(请求头 Accept: application/x-ndjson 时按NDJSON逐行流式返回)"""
     try:
-        positions = trader.position
-        logger.info(f"获取持仓: {len(positions)} 只股票")
-        
-        return create_response(
-            success=True,
-            message="获取持仓成功",
-            data=positions
-        )
+        positions, stale = await read_trader_cached(request.app, "position")
+    except HTTPException:
+        raise
     except Exception as e:
-        logger.error(f"获取持仓失败: {e}")
+        logger.error("获取持仓失败: %s", e)
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
             detail=f"获取持仓失败: {str(e)}"
         )
 
+    if logger.isEnabledFor(logging.INFO):
+        logger.info("获取持仓: %s 只股票", len(positions))
+    if wants_ndjson(request):
+        return ndjson_response(positions, stale, cache_age_ms("position"))
+    return create_response(
+        success=True,
+        message="获取持仓成功",
+        data=positions,
+        headers=STALE_HEADERS if stale else None,
+        stale_ms=cache_age_ms("position")
+    )
+
 
-@app.get("/balance", response_model=ResponseModel)
-async def get_balance():
+@app.get("/balance", responses=DOC_RESPONSES)
+async def get_balance(request: Request):
     """获取账户余额"""
-    if not trader or not trader_connected:
-        raise HTTPException(
-            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
-            detail="未登录券商"
-        )
-    
     try:
-        balance = trader.balance
-        logger.info(f"获取余额: {balance}")
-        
-        return create_response(
-            success=True,
-            message="获取余额成功",
-            data=balance
-        )
+        balance, stale = await read_trader_cached(request.app, "balance")
+    except HTTPException:
+        raise
     except Exception as e:
-        logger.error(f"获取余额失败: {e}")
+        logger.error("获取余额失败: %s", e)
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
             detail=f"获取余额失败: {str(e)}"
         )
 
+    logger.info("获取余额: %s", balance)
+    return create_response(
+        success=True,
+        message="获取余额成功",
+        data=balance,
+        headers=STALE_HEADERS if stale else None,
+        stale_ms=cache_age_ms("balance")
+    )
 
-@app.get("/orders", response_model=ResponseModel)
-async def get_orders():
-    """获取当日委托"""
-    if not trader or not trader_connected:
-        raise HTTPException(
-            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
-            detail="未登录券商"
-        )
-    
+
+@app.get("/orders", responses=DOC_RESPONSES)
+async def get_orders(request: Request):
+    """获取当日委托(请求头 Accept: application/x-ndjson 时按NDJSON逐行流式返回)"""
     try:
-        orders = trader.today_entrusts
-        logger.info(f"获取当日委托: {len(orders)} 条")
-        
-        return create_response(
-            success=True,
-            message="获取当日委托成功",
-            data=orders
-        )
+        orders, stale = await read_trader_cached(request.app, "today_entrusts")
+    except HTTPException:
+        raise
     except Exception as e:
-        logger.error(f"获取当日委托失败: {e}")
+        logger.error("获取当日委托失败: %s", e)
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
             detail=f"获取当日委托失败: {str(e)}"
         )
 
+    if logger.isEnabledFor(logging.INFO):
+        logger.info("获取当日委托: %s 条", len(orders))
+    if wants_ndjson(request):
+        return ndjson_response(orders, stale, cache_age_ms("today_entrusts"))
+    return create_response(
+        success=True,
+        message="获取当日委托成功",
+        data=orders,
+        headers=STALE_HEADERS if stale else None,
+        stale_ms=cache_age_ms("today_entrusts")
+    )
 
-@app.get("/today_trades", response_model=ResponseModel)
-async def get_today_trades():
-    """获取当日成交"""
-    if not trader or not trader_connected:
-        raise HTTPException(
-            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
-            detail="未登录券商"
-        )
-    
+
+@app.get("/today_trades", responses=DOC_RESPONSES)
+async def get_today_trades(request: Request):
+    """获取当日成交(请求头 Accept: application/x-ndjson 时按NDJSON逐行流式返回)"""
     try:
-        trades = trader.today_trades
-        logger.info(f"获取当日成交: {len(trades)} 条")
-        
-        return create_response(
-            success=True,
-            message="获取当日成交成功",
-            data=trades
-        )
+        trades, stale = await read_trader_cached(request.app, "today_trades")
+    except HTTPException:
+        raise
     except Exception as e:
-        logger.error(f"获取当日成交失败: {e}")
+        logger.error("获取当日成交失败: %s", e)
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
             detail=f"获取当日成交失败: {str(e)}"
         )
 
+    if logger.isEnabledFor(logging.INFO):
+        logger.info("获取当日成交: %s 条", len(trades))
+    if wants_ndjson(request):
+        return ndjson_response(trades, stale, cache_age_ms("today_trades"))
+    return create_response(
+        success=True,
+        message="获取当日成交成功",
+        data=trades,
+        headers=STALE_HEADERS if stale else None,
+        stale_ms=cache_age_ms("today_trades")
+    )
+
+
+@app.get("/snapshot", responses=DOC_RESPONSES)
+async def get_snapshot(request: Request):
+    """
+    一次获取余额、持仓、当日委托和当日成交，仅加锁一次，供看板刷新使用
+    某项读取失败但有旧数据时返回旧数据并附带 X-Cache: stale，无旧数据时返回500
+    """
+    missing = [attr for attr in SNAPSHOT_FIELDS.values() if not _cache_usable(attr)]
+    fallback = []
+    if missing:
+        async with request.app.state.trader.lock:
+            st = request.app.state.trader
+            if not st.client or not st.connected:
+                raise _ERR_NOT_CONNECTED.with_traceback(None)
+
+            # 缓存可用的部分直接复用，其余逐个读取；读取失败时与单项接口一致，有旧数据则回退并标记过期
+            missing = [attr for attr in SNAPSHOT_FIELDS.values() if not _cache_usable(attr)]
+            for attr in missing:
+                try:
+                    value = await run_blocking(_read_attr, st.client, attr)
+                except Exception as e:
+                    if attr not in _cache:
+                        logger.error("获取账户快照失败: %s", e)
+                        raise HTTPException(
+                            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+                            detail=f"获取账户快照失败: {str(e)}"
+                        )
+                    logger.warning("读取%s失败，返回缓存数据: %s", attr, e)
+                    fallback.append(attr)
+                    continue
+                _cache[attr] = (time.monotonic(), value)
+                _refresh_failed.discard(attr)
+
+    snapshot = {field: _cache[attr][1] for field, attr in SNAPSHOT_FIELDS.items()}
+    stale = bool(fallback) or any(_cache_stale(attr) for attr in SNAPSHOT_FIELDS.values())
+    logger.info("获取账户快照: 券商读取 %s 项", len(missing))
+    return create_response(
+        success=True,
+        message="获取账户快照成功",
+        data=snapshot,
+        headers=STALE_HEADERS if stale else None,
+        stale_ms=cache_age_ms(*SNAPSHOT_FIELDS.values())
+    )
+
 
 if __name__ == "__main__":
+    check_deployment()
     port = int(os.getenv("EASYTRADER_PORT", "8888"))
+
+    # uvloop不支持Windows(华泰/银河客户端常见部署环境)，不可用时回退到asyncio
+    try:
+        import uvloop
+        uvloop.install()
+        loop_impl = "uvloop"
+    except ImportError:
+        loop_impl = "asyncio"
+
     uvicorn.run(
         "easytrader_service:app",
         host="0.0.0.0",
         port=port,
         reload=False,
-        log_level="info"
+        loop=loop_impl,
+        http="httptools",
+        log_level=LOG_LEVEL.lower(),
+        access_log=False,
+        workers=WORKERS
     )